@@ -114,7 +114,7 @@ class Classifier(nn.Module):
             x = self.pool2(F.relu(self.conv2(x)))
             x = F.relu(self.conv3(x))
 
-            x = x.view(
+            x = x.reshape(
                 -1, self.filter3_out * self.conv5_out_height * self.conv5_out_width
             )
             x = self.dropout(F.relu(self.fc1(x)))
@@ -125,7 +125,7 @@ class Classifier(nn.Module):
             x = self.pool2(F.leaky_relu(self.conv2(x)))
             x = F.leaky_relu(self.conv3(x))
 
-            x = x.view(
+            x = x.reshape(
                 -1, self.filter3_out * self.conv5_out_height * self.conv5_out_width
             )
             x = self.dropout(F.leaky_relu(self.fc1(x)))
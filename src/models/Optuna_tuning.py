@@ -63,9 +63,6 @@ def objective(trial):
         val_data, batch_size=int(BATCH_SIZE), shuffle=True, num_workers=0
     )
 
-    dataiter = iter(trainloader)
-    images, labels = dataiter.next()
-
     # Initialize the model and transfer to GPU if available
     model = Classifier(
         hype["num_classes"],
@@ -107,7 +104,6 @@ def objective(trial):
 
             # Make a forward pass through the network to get the logits
             log_ps = model(images)
-            ps = torch.exp(log_ps)
 
             # Use the logits to calculate the loss
             loss = criterion(log_ps, labels.long())
@@ -121,7 +117,7 @@ def objective(trial):
             optimizer.step()
 
             # Keep track of how many are correctly classified
-            _, top_class = ps.topk(1, dim=1)
+            top_class = log_ps.argmax(dim=1, keepdim=True)
             equals = top_class == labels.view(*top_class.shape)
             train_correct += equals.type(torch.FloatTensor).sum().item()
         else:
@@ -138,11 +134,10 @@ def objective(trial):
 
                     # Forward pass and compute loss
                     log_ps = model(images)
-                    ps = torch.exp(log_ps)
                     val_loss += criterion(log_ps, labels.long()).item()
 
                     # Keep track of how many are correctly classified
-                    _, top_class = ps.topk(1, dim=1)
+                    top_class = log_ps.argmax(dim=1, keepdim=True)
                     equals = top_class == labels.view(*top_class.shape)
                     val_correct += equals.type(torch.FloatTensor).sum().item()
 
@@ -67,8 +67,9 @@ def evaluate_model(
     )
     logger.info(f"Length of Test Data : {len(test_set)}")
 
-    # Evaluate test performance
-    test_correct = 0
+    # Evaluate test performance. Accumulate on the device to avoid
+    #  synchronizing with it every batch
+    test_correct = torch.zeros((), device=device, dtype=torch.long)
 
     # Turn off gradients for validation, saves memory and computations
     with torch.no_grad():
@@ -81,11 +82,11 @@ def evaluate_model(
 
             # Forward pass
             log_ps = model(images)
-            ps = torch.exp(log_ps)
 
-            # Keep track of how many are correctly classified
-            top_p, top_class = ps.topk(1, dim=1)
+            # Keep track of how many are correctly classified. The most likely
+            #  class is the same for the log-probabilities and the probabilities
+            top_class = log_ps.argmax(dim=1, keepdim=True)
             equals = top_class == labels.view(*top_class.shape)
-            test_correct += equals.type(torch.FloatTensor).sum().item()
-        test_accuracy = test_correct / len(test_set)
+            test_correct += equals.sum()
+        test_accuracy = test_correct.item() / len(test_set)
     return test_accuracy
@@ -5,11 +5,13 @@ import sys
 from pathlib import Path
 
 import hydra
+import matplotlib.pyplot as plt
 import optuna
 from azureml.core import Run
 from omegaconf import OmegaConf
 
-from src.models.train_model import train_model
+from src.models.train_model import (download_training_set, load_training_set,
+                                    train_model)
 
 project_dir = Path(__file__).resolve().parents[2]
 project_dir_str = str(project_dir)
@@ -35,6 +37,12 @@ def hyperparameter_tuning_hydra(config):
         training_figures_filepath = "./outputs/" + paths.training_figures_filepath
         os.makedirs(os.path.dirname(training_figures_filepath), exist_ok=True)
 
+    # Load the training set once and share it between all of the trials
+    train_set_path = Path(project_dir_str + paths.training_data_filepath)
+    if bounds.use_azure:
+        download_training_set(train_set_path)
+    train_tensors = load_training_set(train_set_path)
+
     # Add stream handler of stdout to show the messages
     optuna.logging.get_logger("optuna").addHandler(logging.StreamHandler(sys.stdout))
 
@@ -51,6 +59,7 @@ def hyperparameter_tuning_hydra(config):
             trial,
             paths=paths,
             optuna_settings=bounds,
+            train_tensors=train_tensors,
         ),
         n_trials=bounds.n_trials,
     )
@@ -68,10 +77,18 @@ def hyperparameter_tuning_hydra(config):
         bbox_inches="tight",
     )
 
-    # Plot intermediate values of all trials in a study -
+    # Plot the validation accuracies of all trials in a study -
     # Visualize the learning curves of the trials
-    ax = optuna.visualization.matplotlib.plot_intermediate_values(study)
-    fig = ax.figure
+    fig, ax = plt.subplots(figsize=(12, 8))
+    for trial in study.trials:
+        ax.plot(
+            trial.user_attrs.get("val_accuracies", []),
+            marker=".",
+            label=f"Trial {trial.number}",
+        )
+    ax.set_xlabel("Epoch number")
+    ax.set_ylabel("Validation accuracy")
+    ax.legend(bbox_to_anchor=(1.01, 1), loc="upper left")
     if bounds.use_azure:
         run.log_image(name="Optuna learning curves of the trials", plot=fig)
     fig.savefig(
@@ -99,6 +116,7 @@ def optuna_objective(
     trial,
     paths,
     optuna_settings,
+    train_tensors=None,
 ):
     # Suggest a set of hyperparameters
     learning_rate = trial.suggest_loguniform(
@@ -132,6 +150,7 @@ def optuna_objective(
         seed=optuna_settings.seed,
         trial=trial,
         save_training_results=False,
+        train_tensors=train_tensors,
     )
     return train_val_dict["val_accuracies"][-1]
 
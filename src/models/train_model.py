@@ -1,21 +1,391 @@
 import logging
+import math
 import os
 import pickle
 from pathlib import Path
 
 import gdown
+import matplotlib
 import matplotlib.pyplot as plt
 import numpy as np
 import optuna
 import torch
 from azureml.core import Run
 from torch import nn, optim
-from torch.utils.data import random_split
+from torch.nn.parallel import DistributedDataParallel
+from torch.utils.data import DistributedSampler, TensorDataset
 
 # from src.data.MakeDataset import MakeDataset
 from src.models.Classifier import Classifier
 from src.models.Hyperparameters import Hyperparameters as hp
 
+# Only save the figures to files, so they can be made without a display
+matplotlib.use("Agg")
+
+
+class CUDAPrefetcher:
+    """Iterates over a data loader while copying the next batch to the device
+    on a separate CUDA stream, so the copy overlaps with the current batch"""
+
+    def __init__(self, loader, device, memory_format=torch.preserve_format):
+        self.loader = iter(loader)
+        self.device = device
+        self.memory_format = memory_format
+        self.stream = torch.cuda.Stream() if device.type == "cuda" else None
+        self.preload()
+
+    def preload(self):
+        """Starts copying the next batch to the device"""
+        try:
+            self.next_images, self.next_labels = next(self.loader)
+        except StopIteration:
+            self.next_images, self.next_labels = None, None
+            return
+
+        # Batches sliced from a data set that already lives on the device are
+        #  only converted to the memory format. That is done on the current
+        #  stream, so it is ordered after the slicing that produced the batch
+        stream = self.stream
+        if self.next_images.device == self.device:
+            stream = None
+
+        with torch.cuda.stream(stream):
+            self.next_images = self.next_images.to(
+                self.device, non_blocking=True, memory_format=self.memory_format
+            )
+            self.next_labels = self.next_labels.to(self.device, non_blocking=True)
+
+    def next(self):
+        """Returns the preloaded batch, or (None, None) once exhausted"""
+        images, labels = self.next_images, self.next_labels
+        if self.stream is not None:
+            # Wait for the copy and mark the tensors as used by the current
+            #  stream so their memory is not reused by the copy stream too early
+            current_stream = torch.cuda.current_stream()
+            current_stream.wait_stream(self.stream)
+            if images is not None:
+                images.record_stream(current_stream)
+                labels.record_stream(current_stream)
+        self.preload()
+        return images, labels
+
+
+class TensorBatchLoader:
+    """Iterates over mini-batches sliced directly from tensors that already
+    live on the device, without going through a DataLoader"""
+
+    def __init__(self, images, labels, batch_size, shuffle=False, drop_last=False):
+        self.images = images
+        self.labels = labels
+        self.batch_size = batch_size
+        self.shuffle = shuffle
+        self.drop_last = drop_last
+
+    def __len__(self):
+        if self.drop_last:
+            return len(self.images) // self.batch_size
+        return math.ceil(len(self.images) / self.batch_size)
+
+    def __iter__(self):
+        n = len(self.images)
+        device = self.images.device
+        if self.shuffle:
+            perm = torch.randperm(n, device=device)
+        else:
+            perm = torch.arange(n, device=device)
+        for idx in perm.split(self.batch_size):
+            if self.drop_last and len(idx) < self.batch_size:
+                break
+            yield self.images[idx], self.labels[idx]
+
+
+def fits_on_device(tensors, device, fraction=0.5):
+    """Checks if the tensors fit within a fraction of the free GPU memory"""
+    if device.type != "cuda":
+        return False
+    if hasattr(torch.cuda, "mem_get_info"):
+        free_memory = torch.cuda.mem_get_info(device)[0]
+    else:
+        free_memory = torch.cuda.get_device_properties(
+            device
+        ).total_memory - torch.cuda.memory_reserved(device)
+    size = sum(t.element_size() * t.nelement() for t in tensors)
+    return size < fraction * free_memory
+
+
+def download_training_set(train_set_path):
+    """Downloads the processed training set to the given path"""
+    # gdown only creates the output directory when given a directory path
+    os.makedirs(Path(train_set_path).parent, exist_ok=True)
+    gdown.download(
+        "https://drive.google.com/uc?id=1c_3EFqYiO4VhF4SRfJorsY577PbmHnSy",
+        str(train_set_path),
+        quiet=False,
+    )
+
+
+def load_training_set(train_set_path):
+    """Loads the training images and labels. The file is memory mapped when
+    possible, so that it is read from the OS page cache instead of being
+    deserialized into memory before the training and validation split"""
+    try:
+        return torch.load(train_set_path, mmap=True, weights_only=True)
+    except (TypeError, RuntimeError, pickle.UnpicklingError):
+        # Older PyTorch versions and legacy files cannot be memory mapped
+        return torch.load(train_set_path)
+
+
+def setup_distributed():
+    """Joins the process group when launched with torch.distributed.run and
+    returns the local rank, or None when training in a single process"""
+    if int(os.environ.get("WORLD_SIZE", 1)) <= 1:
+        return None
+    local_rank = int(os.environ["LOCAL_RANK"])
+    torch.cuda.set_device(local_rank)
+    torch.distributed.init_process_group("nccl")
+    return local_rank
+
+
+def is_main_process():
+    """Checks if this is the process that logs and saves the results"""
+    return (
+        not torch.distributed.is_initialized() or torch.distributed.get_rank() == 0
+    )
+
+
+def setup_device():
+    """Selects the device to train on and returns it with the local rank of the
+    process, which is None unless launched with torch.distributed.run"""
+    # Check if there is a GPU available to use
+    if torch.cuda.is_available():
+        print("The code will run on GPU.")
+    else:
+        print("The code will run on CPU.")
+
+    # Use one GPU per process when launched with torch.distributed.run
+    local_rank = setup_distributed()
+    if local_rank is not None:
+        return torch.device("cuda", local_rank), local_rank
+    return torch.device("cuda:0" if torch.cuda.is_available() else "cpu"), None
+
+
+def start_azure_run(train_set_path, download, learning_rate, epochs, dropout_p):
+    """Downloads the training set once per node if needed and returns the
+    Azure run context with the hyperparameters logged"""
+    if download and int(os.environ.get("LOCAL_RANK", 0)) == 0:
+        download_training_set(train_set_path)
+    if torch.distributed.is_initialized():
+        # Wait for the download before any process loads the data set
+        torch.distributed.barrier()
+    print("Dataset created")
+
+    # Get the experiment run context. That is, retrieve the experiment
+    # run context when the script is run
+    run = Run.get_context()
+    if is_main_process():
+        run.log("Learning rate", learning_rate)
+        run.log("Epochs", epochs)
+        run.log("Dropout", dropout_p)
+    return run
+
+
+def finish_training(run, complete_run):
+    """Completes the Azure run and leaves the process group, if any"""
+    if run is not None and complete_run and is_main_process():
+        # Complete the run
+        run.complete()
+        print("Completed running the training expriment")
+
+    if torch.distributed.is_initialized():
+        torch.distributed.destroy_process_group()
+
+
+def wrap_model(model, local_rank, compile_model):
+    """Wraps the model for distributed training and compiles it if requested.
+    The returned model shares its parameters with the given one"""
+    net = model
+    if local_rank is not None:
+        net = DistributedDataParallel(model, device_ids=[local_rank])
+    if compile_model:
+        net = torch.compile(net, mode="reduce-overhead", fullgraph=False)
+    return net
+
+
+def set_loader_epoch(loader, epoch):
+    """Shuffles the shards of a distributed data loader differently every epoch"""
+    if isinstance(getattr(loader, "sampler", None), DistributedSampler):
+        loader.sampler.set_epoch(epoch)
+
+
+def create_data_loaders(
+    train_data, val_data, batch_size, device, drop_last=False, distributed=False
+):
+    """Creates the training and validation loaders for the split data set"""
+    if not distributed and fits_on_device(
+        train_data.tensors + val_data.tensors, device
+    ):
+        # Move the entire data set to the GPU once and slice the batches from
+        #  it directly, which removes all host to device copies per batch
+        trainloader = TensorBatchLoader(
+            *(t.to(device) for t in train_data.tensors),
+            batch_size,
+            shuffle=True,
+            drop_last=drop_last,
+        )
+        valoader = TensorBatchLoader(
+            *(t.to(device) for t in val_data.tensors), batch_size, shuffle=True
+        )
+        return trainloader, valoader
+
+    # Load batches in background workers into pinned memory so that the
+    #  host to device copies can overlap with the computations on the GPU.
+    #  The workers used to be disabled (num_workers=0) because they gave an
+    #  error, so set num_workers to 0 here if that happens again
+    loader_kwargs = {"pin_memory": device.type == "cuda"}
+    num_workers = min(4, (os.cpu_count() or 1) // 2)
+    if num_workers > 0:
+        loader_kwargs.update(
+            num_workers=num_workers, persistent_workers=True, prefetch_factor=4
+        )
+
+    # Each process trains and validates on its own shard of the data when
+    #  distributed
+    train_sampler = val_sampler = None
+    if distributed:
+        train_sampler = DistributedSampler(
+            train_data, shuffle=True, drop_last=drop_last
+        )
+        val_sampler = DistributedSampler(val_data, shuffle=False)
+    trainloader = torch.utils.data.DataLoader(
+        train_data,
+        batch_size=batch_size,
+        shuffle=train_sampler is None,
+        sampler=train_sampler,
+        drop_last=drop_last,
+        **loader_kwargs,
+    )
+
+    valoader = torch.utils.data.DataLoader(
+        val_data,
+        batch_size=batch_size,
+        shuffle=val_sampler is None,
+        sampler=val_sampler,
+        **loader_kwargs,
+    )
+    return trainloader, valoader
+
+
+def reduce_across_processes(device, *values):
+    """Sums the values over all of the processes when training distributed and
+    returns them as floats, synchronizing with the device only once"""
+    values = torch.stack(
+        [torch.as_tensor(v, device=device, dtype=torch.float64) for v in values]
+    )
+    if torch.distributed.is_initialized():
+        torch.distributed.all_reduce(values)
+    return values.tolist()
+
+
+def report_and_prune(trial, value, step):
+    """Reports an intermediate value to Optuna and prunes the trial if needed"""
+    trial.report(value, step)
+    if trial.should_prune():
+        raise optuna.TrialPruned()
+
+
+def train_epoch(
+    net,
+    trainloader,
+    criterion,
+    optimizer,
+    scaler,
+    device,
+    use_amp,
+    memory_format,
+    trial,
+    epoch,
+):
+    """Trains the network for one epoch and returns the summed training loss,
+    the number of correct predictions, samples seen and batches over all of
+    the processes"""
+    # Accumulate on the device to avoid synchronizing with it every batch
+    train_loss = torch.zeros((), device=device)
+    train_correct = torch.zeros((), device=device, dtype=torch.long)
+    train_seen = 0
+    batch_idx = 0
+
+    # Set model to training mode
+    net.train()
+
+    # Iterate over the batches while the next one is copied to the device
+    prefetcher = CUDAPrefetcher(trainloader, device, memory_format)
+    images, labels = prefetcher.next()
+    while images is not None:
+        # Reset the gradients since they accumulated
+        optimizer.zero_grad(set_to_none=True)
+
+        with torch.cuda.amp.autocast(enabled=use_amp):
+            # Make a forward pass through the network to get the logits
+            log_ps = net(images)
+
+            # Use the logits to calculate the loss
+            loss = criterion(log_ps, labels.long())
+        train_loss += loss.detach()
+
+        # Perform a backward pass through the network
+        #  to calculate the gradients of the scaled loss
+        scaler.scale(loss).backward()
+
+        # Take a step with the optimizer to update the weights
+        scaler.step(optimizer)
+        scaler.update()
+
+        # Keep track of how many are correctly classified
+        train_correct += (log_ps.argmax(dim=1) == labels).sum()
+        train_seen += len(labels)
+        batch_idx += 1
+
+        if trial and batch_idx == len(trainloader) // 2:
+            # Report the running training accuracy halfway through the
+            #  epoch, so that trials which are doing badly can be pruned
+            #  before spending time on the rest of the epoch and validation
+            report_and_prune(trial, train_correct.item() / train_seen, 2 * epoch)
+
+        images, labels = prefetcher.next()
+    return reduce_across_processes(
+        device, train_loss, train_correct, train_seen, batch_idx
+    )
+
+
+def validate(net, valoader, criterion, device, use_amp, memory_format):
+    """Computes the summed validation loss, the number of correct predictions,
+    samples seen and batches over all of the processes"""
+    val_loss = torch.zeros((), device=device)
+    val_correct = torch.zeros((), device=device, dtype=torch.long)
+    val_seen = 0
+    val_batches = 0
+
+    # Turn off gradients and autograd tracking for validation, saves memory
+    #  and computations
+    net.eval()  # Sets the model to evaluation mode
+    with torch.inference_mode(), torch.cuda.amp.autocast(enabled=use_amp):
+        prefetcher = CUDAPrefetcher(valoader, device, memory_format)
+        images, labels = prefetcher.next()
+        while images is not None:
+            # Forward pass and compute loss
+            log_ps = net(images)
+            val_loss += criterion(log_ps, labels.long())
+
+            # Keep track of how many are correctly classified
+            val_correct += (log_ps.argmax(dim=1) == labels).sum()
+            val_seen += len(labels)
+            val_batches += 1
+
+            images, labels = prefetcher.next()
+    return reduce_across_processes(
+        device, val_loss, val_correct, val_seen, val_batches
+    )
+
 
 def train_model(
     trained_model_filepath,
@@ -29,76 +399,77 @@ def train_model(
     seed=0,
     trial=None,
     save_training_results=True,
+    train_tensors=None,
 ):
 
-    # Check if there is a GPU available to use
-    if torch.cuda.is_available():
-        print("The code will run on GPU.")
-    else:
-        print("The code will run on CPU.")
-    device = torch.device("cuda:0" if torch.cuda.is_available() else "cpu")
+    device, local_rank = setup_device()
+    distributed = local_rank is not None
+
+    if device.type == "cuda":
+        # Let cuDNN pick the fastest convolution algorithms for the fixed input
+        #  shape and use TF32 tensor cores on Ampere or newer GPUs. This trades
+        #  bitwise reproducibility between runs for speed, even with the seed set
+        torch.backends.cudnn.benchmark = True
+        torch.backends.cuda.matmul.allow_tf32 = True
+        torch.backends.cudnn.allow_tf32 = True
     seed = 0
     # Set the seed for reproducibility
     torch.manual_seed(seed)
     np.random.seed(seed)
 
     project_dir = Path(__file__).resolve().parents[2]
+    train_set_path = project_dir.joinpath("data", "processed", "training.pt")
 
     run = None
     if use_azure:
-        pathForData = str(project_dir) + "/data/processed/"
-
-        gdown.download(
-            "https://drive.google.com/uc?id=1c_3EFqYiO4VhF4SRfJorsY577PbmHnSy",
-            pathForData,
-            quiet=False,
+        # Only download the data set when it was not passed in
+        run = start_azure_run(
+            train_set_path, train_tensors is None, learning_rate, epochs, dropout_p
         )
-        print("Dataset created")
-
-        # Get the experiment run context. That is, retrieve the experiment
-        # run context when the script is run
-        run = Run.get_context()
-        run.log("Learning rate", learning_rate)
-        run.log("Epochs", epochs)
-        run.log("Dropout", dropout_p)
 
     log_fmt = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
     logging.basicConfig(level=logging.INFO, format=log_fmt)
     logger = logging.getLogger(__name__)
     logger.info("Training a fish classifier")
 
-    train_set_path = str(project_dir) + "/data/processed/training.pt"
-    train_imgs, train_labels = torch.load(train_set_path)  # img, label
-
-    # load data
-    train_set = torch.utils.data.TensorDataset(train_imgs, train_labels)
-
-    # split data in training and validation set
-    train_n = int(0.85 * len(train_set))
-    val_n = len(train_set) - train_n
-    train_data, val_data = random_split(train_set, [train_n, val_n])
+    if train_tensors is None:
+        train_tensors = load_training_set(train_set_path)
+    train_imgs, train_labels = train_tensors  # img, label
+
+    # split data in training and validation set by slicing the tensors with
+    #  a seeded permutation, instead of indexing the samples one at a time
+    train_n = int(0.85 * len(train_imgs))
+    perm = torch.randperm(len(train_imgs), generator=torch.Generator().manual_seed(seed))
+    train_idx, val_idx = perm[:train_n], perm[train_n:]
+    train_data = TensorDataset(train_imgs[train_idx], train_labels[train_idx])
+    val_data = TensorDataset(train_imgs[val_idx], train_labels[val_idx])
     print(f"Length of Train Data : {len(train_data)}")
     print(f"Length of Validation Data : {len(val_data)}")
 
     # Hyper parameters
     hype = hp().config
-    batch_size = batch_size
+    batch_size = int(batch_size)  # Optuna suggests batch sizes as floats
     lr = learning_rate
     epochs = epochs
 
-    trainloader = torch.utils.data.DataLoader(
-        train_data, batch_size=batch_size, shuffle=True, num_workers=0
-    )  # changed num_workers to 0 because i was getting error
-
-    valoader = torch.utils.data.DataLoader(
-        val_data, batch_size=batch_size, shuffle=True, num_workers=0
+    # Compile the model on the GPU. The training batches are then kept at a
+    #  constant size so that the compiled graph is only captured once, and the
+    #  validation runs through the uncompiled model so that its smaller last
+    #  batch does not capture a second graph
+    compile_model = hasattr(torch, "compile") and device.type == "cuda"
+
+    trainloader, valoader = create_data_loaders(
+        train_data,
+        val_data,
+        batch_size,
+        device,
+        drop_last=compile_model,
+        distributed=distributed,
     )
 
-    dataiter = iter(trainloader)
-    images, labels = dataiter.next()
-
-    print("Image shape", images.shape)
-    print("Labels shape", labels.shape)
+    if logger.isEnabledFor(logging.DEBUG):
+        image, label = train_data[0]
+        logger.debug("Image shape %s, label shape %s", image.shape, label.shape)
 
     # Initialize the model and transfer to GPU if available
     model = Classifier(
@@ -118,89 +489,74 @@ def train_model(
         hype["activation"],
         dropout_p,
     )
-    model = model.to(device)
+    # Use the channels last memory format on the GPU, which lets cuDNN run the
+    #  convolutions on tensor cores without transposing the images first
+    memory_format = torch.preserve_format
+    if device.type == "cuda":
+        memory_format = torch.channels_last
+    model = model.to(device, memory_format=memory_format)
+
+    # The wrapped and compiled models share their parameters with the model
+    #  that is saved
+    net = wrap_model(model, local_rank, compile_model)
 
     criterion = nn.NLLLoss()
     optimizer = optim.Adam(model.parameters(), lr=lr)
 
+    # Use automatic mixed precision on the GPU. The gradient scaler keeps
+    #  small float16 gradients from underflowing to zero
+    use_amp = device.type == "cuda"
+    scaler = torch.cuda.amp.GradScaler(enabled=use_amp)
+
     # Implement the training loop
     print("Start training")
     train_losses, val_losses, train_accuracies, val_accuracies = [], [], [], []
     for e in range(epochs):
-        train_loss = 0
-        train_correct = 0
-
-        for images, labels in trainloader:
-            # Transfering images and labels to GPU if available
-            images, labels = images.to(device), labels.to(device)
-
-            # Set model to training mode and zero
-            #  gradients since they accumulated
-            model.train()
-            optimizer.zero_grad()
-
-            # Make a forward pass through the network to get the logits
-            log_ps = model(images)
-            ps = torch.exp(log_ps)
-
-            # Use the logits to calculate the loss
-            loss = criterion(log_ps, labels.long())
-            train_loss += loss.item()
-
-            # Perform a backward pass through the network
-            #  to calculate the gradients
-            loss.backward()
+        # Shuffle the shards differently in every epoch
+        set_loader_epoch(trainloader, e)
+
+        train_loss, train_correct, train_seen, train_batches = train_epoch(
+            net,
+            trainloader,
+            criterion,
+            optimizer,
+            scaler,
+            device,
+            use_amp,
+            memory_format,
+            trial,
+            e,
+        )
 
-            # Take a step with the optimizer to update the weights
-            optimizer.step()
+        # Compute validattion loss and accuracy
+        val_loss, val_correct, val_seen, val_batches = validate(
+            model, valoader, criterion, device, use_amp, memory_format
+        )
 
-            # Keep track of how many are correctly classified
-            top_p, top_class = ps.topk(1, dim=1)
-            equals = top_class == labels.view(*top_class.shape)
-            train_correct += equals.type(torch.FloatTensor).sum().item()
-        else:
-            # Compute validattion loss and accuracy
-            val_loss = 0
-            val_correct = 0
-
-            # Turn off gradients for validation, saves memory and computations
-            with torch.no_grad():
-                model.eval()  # Sets the model to evaluation mode
-                for images, labels in valoader:
-                    # Transfering images and labels to GPU if available
-                    images, labels = images.to(device), labels.to(device)
-
-                    # Forward pass and compute loss
-                    log_ps = model(images)
-                    ps = torch.exp(log_ps)
-                    val_loss += criterion(log_ps, labels.long()).item()
-
-                    # Keep track of how many are correctly classified
-                    top_p, top_class = ps.topk(1, dim=1)
-                    equals = top_class == labels.view(*top_class.shape)
-                    val_correct += equals.type(torch.FloatTensor).sum().item()
-
-            # Store and print losses and accuracies
-            train_losses.append(train_loss / len(trainloader))
-            train_accuracies.append(train_correct / len(train_data))
-            val_losses.append(val_loss / len(valoader))
-            val_accuracies.append(val_correct / len(val_data))
-
-            logger.info(
-                str("Epoch: {}/{}.. ".format(e + 1, epochs))
-                + str("Training Loss: {:.3f}.. ".format(train_losses[-1]))
-                + str("Training Accuracy: {:.3f}.. ".format(train_accuracies[-1]))
-                + str("Validation Loss: {:.3f}.. ".format(val_losses[-1]))
-                + str("Validation Accuracy: {:.3f}.. ".format(val_accuracies[-1]))
-            )
+        # Store and print losses and accuracies
+        train_losses.append(train_loss / train_batches)
+        train_accuracies.append(train_correct / train_seen)
+        val_losses.append(val_loss / val_batches)
+        val_accuracies.append(val_correct / val_seen)
+
+        logger.info(
+            "Epoch: %d/%d.. Training Loss: %.3f.. Training Accuracy: %.3f.. "
+            "Validation Loss: %.3f.. Validation Accuracy: %.3f.. ",
+            e + 1,
+            epochs,
+            train_losses[-1],
+            train_accuracies[-1],
+            val_losses[-1],
+            val_accuracies[-1],
+        )
 
         if trial:
-            # Report intermediate objective value
-            trial.report(val_accuracies[-1], e)
+            # Keep the validation accuracies per epoch apart from the intermediate
+            #  values, which also hold the training accuracies halfway through
+            trial.set_user_attr("val_accuracies", val_accuracies)
 
-            # Handle pruning based on the intermediate value
-            if trial.should_prune():
-                raise optuna.TrialPruned()
+            # Report intermediate objective value and handle pruning based on it
+            report_and_prune(trial, val_accuracies[-1], 2 * e + 1)
 
     # Save the training and validation losses and accuracies as a dictionary
     train_val_dict = {
@@ -210,7 +566,7 @@ def train_model(
         "val_accuracies": val_accuracies,
     }
 
-    if save_training_results:
+    if save_training_results and is_main_process():
         save_results(
             project_dir,
             trained_model_filepath,
@@ -222,10 +578,7 @@ def train_model(
             run,
         )
 
-    if use_azure and not trial:
-        # Complete the run
-        run.complete()
-        print("Completed running the training expriment")
+    finish_training(run, complete_run=not trial)
     return train_val_dict
 
 
@@ -243,7 +596,7 @@ def save_results(
     # Set file paths depending on running locally or on Azure
     model_path = project_dir.joinpath(trained_model_filepath)
     dict_path = project_dir.joinpath(training_statistics_filepath).joinpath(
-        "train_val_dict.pickle"
+        "train_val_dict.pt"
     )
     l_fig_path = project_dir.joinpath(training_figures_filepath).joinpath(
         "Training_Loss.pdf"
@@ -253,55 +606,63 @@ def save_results(
     )
 
     if use_azure:
+        outputs_dir = Path("outputs")
+
         # Update model path and make sure it exists
-        os.makedirs("./outputs", exist_ok=True)
-        model_path = "./outputs/" + trained_model_filepath
-        os.makedirs(os.path.dirname(model_path), exist_ok=True)
+        model_path = outputs_dir.joinpath(trained_model_filepath)
+        os.makedirs(model_path.parent, exist_ok=True)
 
         # Update dictionary path
-        dict_path = (
-            "./outputs/" + training_statistics_filepath + "train_val_dict.pickle"
+        dict_path = outputs_dir.joinpath(
+            training_statistics_filepath, "train_val_dict.pt"
         )
-        os.makedirs(os.path.dirname(dict_path), exist_ok=True)
+        os.makedirs(dict_path.parent, exist_ok=True)
 
         # Update figure paths
-        figures_path = "./outputs/" + training_figures_filepath
+        figures_path = outputs_dir.joinpath(training_figures_filepath)
         os.makedirs(figures_path, exist_ok=True)
-        l_fig_path = figures_path + "Training_Loss.pdf"
-        a_fig_path = figures_path + "Training_Accuracy.pdf"
-
-        # Log the training and validation losses and accuracies
-        run.log_list("Train loss", train_val_dict["train_losses"])
-        run.log_list("Train accuracy", train_val_dict["train_accuracies"])
-        run.log_list("Validation loss", train_val_dict["val_losses"])
-        run.log_list("Validation accuracy", train_val_dict["val_accuracies"])
+        l_fig_path = figures_path.joinpath("Training_Loss.pdf")
+        a_fig_path = figures_path.joinpath("Training_Accuracy.pdf")
+
+        # Log the training and validation losses and accuracies as one table
+        #  in a single call
+        run.log_table(
+            "Training statistics",
+            {
+                "epoch": list(range(len(train_val_dict["train_losses"]))),
+                "train_loss": train_val_dict["train_losses"],
+                "train_accuracy": train_val_dict["train_accuracies"],
+                "val_loss": train_val_dict["val_losses"],
+                "val_accuracy": train_val_dict["val_accuracies"],
+            },
+        )
 
     # Save the trained network
     torch.save(model.state_dict(), model_path)
 
-    with open(dict_path, "wb") as f:
-        # Pickle the 'train_val_dict' dictionary using
-        #  the highest protocol available
-        pickle.dump(train_val_dict, f, pickle.HIGHEST_PROTOCOL)
+    # Save the 'train_val_dict' dictionary
+    torch.save(train_val_dict, dict_path)
 
     # Plot the training loss curve
-    f = plt.figure(figsize=(12, 8))
-    plt.plot(train_val_dict["train_losses"], label="Training loss")
-    plt.plot(train_val_dict["val_losses"], label="Validation loss")
-    plt.xlabel("Epoch number")
-    plt.ylabel("Loss")
-    plt.legend()
+    f, ax = plt.subplots(figsize=(12, 8))
+    ax.plot(train_val_dict["train_losses"], label="Training loss")
+    ax.plot(train_val_dict["val_losses"], label="Validation loss")
+    ax.set_xlabel("Epoch number")
+    ax.set_ylabel("Loss")
+    ax.legend()
     if use_azure:
         run.log_image(name="Training loss curve", plot=f)
     f.savefig(l_fig_path, bbox_inches="tight")
+    plt.close(f)
 
     # Plot the training accuracy curve
-    f = plt.figure(figsize=(12, 8))
-    plt.plot(train_val_dict["train_accuracies"], label="Training accuracy")
-    plt.plot(train_val_dict["val_accuracies"], label="Validation accuracy")
-    plt.xlabel("Epoch number")
-    plt.ylabel("Accuracy")
-    plt.legend()
+    f, ax = plt.subplots(figsize=(12, 8))
+    ax.plot(train_val_dict["train_accuracies"], label="Training accuracy")
+    ax.plot(train_val_dict["val_accuracies"], label="Validation accuracy")
+    ax.set_xlabel("Epoch number")
+    ax.set_ylabel("Accuracy")
+    ax.legend()
     if use_azure:
         run.log_image(name="Training accuracy curve", plot=f)
     f.savefig(a_fig_path, bbox_inches="tight")
+    plt.close(f)
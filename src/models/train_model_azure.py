@@ -1,11 +1,24 @@
 # -*- coding: utf-8 -*-
-import glob
 import os.path
 
 import click
 from azureml.core import (ComputeTarget, Environment, Experiment,
                           ScriptRunConfig, Workspace)
-from azureml.core.conda_dependencies import CondaDependencies
+
+# NVIDIA's PyTorch container ships PyTorch with CUDA, cuDNN and NCCL, so only
+#  the remaining packages have to be installed on top of it
+PYTORCH_IMAGE = "nvcr.io/nvidia/pytorch:24.04-py3"
+PIP_PACKAGES = [
+    "azureml-defaults",
+    "pandas",
+    "matplotlib",
+    "kornia",
+    "gdown",
+    "pillow",
+    "optuna",
+    "hydra-core",
+    "scikit-learn",
+]
 
 
 @click.command()
@@ -23,12 +36,21 @@ from azureml.core.conda_dependencies import CondaDependencies
     default=False,
     help="Set to True to trian the final model (default is False)",
 )
-def main(use_optuna, train_final):
+@click.option(
+    "-np",
+    "--nproc_per_node",
+    type=int,
+    default=1,
+    help="Number of GPUs to train on with DistributedDataParallel (default is 1)",
+)
+def main(use_optuna, train_final, nproc_per_node):
     print(train_final)
 
-    # Create a Python environment for the experiment
-    # env = Environment("mlops_project")
-    env = Environment("experiment-fish-classifier-final-model")
+    # Create a Python environment for the experiment from the PyTorch container
+    env = Environment.from_docker_image(
+        name="experiment-fish-classifier-final-model", image=PYTORCH_IMAGE
+    )
+    env.python.user_managed_dependencies = True
 
     # Load the workspace from the saved config file
     ws = Workspace.from_config()
@@ -43,50 +65,20 @@ def main(use_optuna, train_final):
     # dataset.download(target_path='./data/processed/', overwrite=False)
 
     print("Finished downloading training set")
-    # Ensure the required packages are installed
-    packages = CondaDependencies.create(
-        conda_packages=["pip"],
-        pip_packages=[
-            "azureml-defaults",
-            "torch",
-            "torchvision",
-            "pandas",
-            "numpy",
-            "matplotlib",
-            "kornia",
-            "gdown",
-            "pillow",
-            "optuna",
-            "hydra"
-            "hydra-core",
-            "sklearn",
-        ],
-    )
-
-    folder_path = "./dist"
-    file_type = "/*"
-    files = glob.glob(folder_path + file_type)
 
-    latest_whl = max(files, key=os.path.getctime)
+    # Create a script config for training. The project root is uploaded so
+    #  that the src package can be imported without installing it
+    experiment_folder = "."
 
-    whl_path = latest_whl
-
-    whl_url = Environment.add_private_pip_wheel(
-        workspace=ws, exist_ok=True, file_path=whl_path
-    )
-    packages.add_pip_package(whl_url)
-    env.python.conda_dependencies = packages
-
-    # Create a script config for training
-    experiment_folder = "./src/models"
-
-    script_args = None
+    script_args = []
     if use_optuna:
-        script = "hyperparameter_tuning.py"
+        script = "src.models.hyperparameter_tuning"
+        nproc_per_node = 1  # Each process would otherwise run its own study
     elif train_final:
-        script = "train_test.py"
+        script = "src.models.train_test"
+        nproc_per_node = 1
     else:
-        script = "train_model_command_line.py"
+        script = "src.models.train_model_command_line"
         e = 50
         lr = 0.00038434
         dropout_p = 0.0
@@ -101,11 +93,27 @@ def main(use_optuna, train_final):
             dropout_p,
         ]
 
+    # Launch one training process per GPU with torch.distributed.run
+    command = [
+        "pip",
+        "install",
+        *PIP_PACKAGES,
+        "&&",
+        "python",
+        "-m",
+        "torch.distributed.run",
+        "--standalone",
+        "--nproc_per_node",
+        nproc_per_node,
+        "-m",
+        script,
+        *script_args,
+    ]
+
     script_config = ScriptRunConfig(
         source_directory=experiment_folder,
-        script=script,
+        command=[str(arg) for arg in command],
         environment=env,
-        arguments=script_args,
         compute_target=compute_target,
     )
 
@@ -131,13 +139,14 @@ def main(use_optuna, train_final):
             print(file)
 
         # Register the model
+        statistics = metrics["Training statistics"]
         model_props = {
             "epochs": e,
             "learning_rate": lr,
-            "Final train loss": metrics["Train loss"][-1],
-            "Final train accuracy": metrics["Train accuracy"][-1],
-            "Final validation loss": metrics["Validation loss"][-1],
-            "Final validation accuracy": metrics["Validation accuracy"][-1],
+            "Final train loss": statistics["train_loss"][-1],
+            "Final train accuracy": statistics["train_accuracy"][-1],
+            "Final validation loss": statistics["val_loss"][-1],
+            "Final validation accuracy": statistics["val_accuracy"][-1],
         }
         run.register_model(
             model_path="./outputs/models/trained_model.pth",
@@ -1,15 +1,44 @@
 # -*- coding: utf-8 -*-
 import os.path
-import pickle
 
 import pytest
 import torch
 
 from src.data.MakeDataset import MakeDataset
-from src.models.train_model import train_model
+from src.models.train_model import TensorBatchLoader, train_model
 
 
 class TestTraining:
+    @pytest.mark.parametrize(
+        "drop_last,n_batches,n_samples", [(False, 4, 10), (True, 3, 9)]
+    )
+    def test_tensor_batch_loader(self, drop_last, n_batches, n_samples):
+        """
+        Test that the device resident loader covers the samples in full batches
+        """
+        images = torch.arange(10).float().reshape(10, 1)
+        labels = torch.arange(10)
+        loader = TensorBatchLoader(
+            images, labels, batch_size=3, shuffle=True, drop_last=drop_last
+        )
+
+        # Check that the number of batches matches the length of the loader
+        batches = list(loader)
+        assert len(loader) == n_batches
+        assert len(batches) == n_batches
+
+        # Check that the images and labels stay paired
+        for batch_images, batch_labels in batches:
+            assert torch.equal(batch_images.flatten().long(), batch_labels)
+
+        # Check that every sample is seen at most once and only the last
+        #  incomplete batch is dropped
+        seen = torch.cat([batch_labels for _, batch_labels in batches])
+        assert len(seen) == n_samples
+        assert len(seen.unique()) == n_samples
+        if drop_last:
+            assert all(len(batch_labels) == 3 for _, batch_labels in batches)
+
     @pytest.mark.parametrize("epochs,learning_rate", [(1, 0.1), (2, 0.001)])
     def test_training(self, epochs, learning_rate):
         """
@@ -54,10 +83,9 @@ class TestTraining:
         )
 
         # Test that losses and accuracies have been saved and can be loaded
-        dict_path = os.path.join(training_statistics_filepath, "train_val_dict.pickle")
+        dict_path = os.path.join(training_statistics_filepath, "train_val_dict.pt")
         assert os.path.isfile(dict_path)
-        with open(dict_path, "rb") as f:
-            dict_load = pickle.load(f)
+        dict_load = torch.load(dict_path)
 
         # Check that the dictionary read in has the same values as the training output
         assert dict["train_losses"] == dict_load["train_losses"]